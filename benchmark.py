@@ -0,0 +1,444 @@
+# benchmark.py - Throughput/latency measurements for Voya's heavier code paths
+#
+# Usage:
+#   python benchmark.py export-import [--stops 100000] [--memory]
+#   python benchmark.py route-storage [--stops 100000] [--steps 5]
+#   python benchmark.py archive [--stops 100000] [--steps 5]
+#   python benchmark.py search [--stops 1000000] [--samples 300]
+#   python benchmark.py registration-flood [--samples 300]
+#   python benchmark.py overload [--load 0.5,1,2,4] [--seconds 20] [--db-latency 20] [--timeout 5]
+#
+# Runs against a throwaway SQLite database unless --database-url is given.
+import argparse
+import io
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+
+def setup_app(database_url):
+    if not database_url:
+        database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'voya-bench.db')
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('SECRET_KEY', 'benchmark')
+    import logging
+    import app as voya
+    logging.disable(logging.CRITICAL)
+    voya.app.config['TESTING'] = True
+    # Test client responses hold their admission slot until closed, which most benchmarks never do;
+    # the overload benchmark switches it back on
+    voya.app.config['ADMISSION_CONTROL'] = False
+    return voya
+
+
+def create_user(voya, name):
+    from models import User
+    with voya.app.app_context():
+        user = User(username=name, email=f'{name}@bench.invalid', password=b'x', email_verified=True)
+        voya.db.session.add(user)
+        voya.db.session.commit()
+        return user.id
+
+
+def client_for(voya, user_id, name):
+    client = voya.app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['username'] = name
+    return client
+
+
+def seed_account(voya, user_id, stops, stops_per_trip=500, steps_per_stop=3, first_day=None):
+    """Bulk insert trips/stops/route steps for one user, a trip every 40 days; returns the created trip ids."""
+    from datetime import date, timedelta
+    from sqlalchemy import insert
+    from models import Trip, Stop, RouteStep
+    db = voya.db
+    trip_ids = []
+    with voya.app.app_context():
+        remaining = stops
+        while remaining > 0:
+            count = min(stops_per_trip, remaining)
+            start = (first_day or date(2020, 1, 1)) + timedelta(days=len(trip_ids) * 40)
+            days = 30
+            trip_id = db.session.execute(insert(Trip).returning(Trip.id), {
+                'user_id': user_id, 'destination': f'City {len(trip_ids)}',
+                'arrival_date': start.isoformat(),
+                'departure_date': (start + timedelta(days=days - 1)).isoformat(),
+            }).scalar_one()
+            stop_rows = [{
+                'trip_id': trip_id, 'user_id': user_id, 'action': f'Visit place {i}',
+                'time': f'{8 + i % 12:02d}:{i % 60:02d}',
+                'date': (start + timedelta(days=i % days)).isoformat(),
+                'destination': f'Landmark {i}', 'route': '; '.join(f'Step {s}' for s in range(steps_per_stop)),
+            } for i in range(count)]
+            stop_ids = db.session.execute(
+                insert(Stop).returning(Stop.id, sort_by_parameter_order=True), stop_rows).scalars().all()
+            if steps_per_stop:
+                db.session.execute(insert(RouteStep), [
+                    {'stop_id': stop_id, 'step_order': s, 'step_text': f'Take line {s} towards stop {stop_id}'}
+                    for stop_id in stop_ids for s in range(steps_per_stop)])
+            db.session.commit()
+            trip_ids.append(trip_id)
+            remaining -= count
+    return trip_ids
+
+
+def report(label, seconds, rows=None, size=None, peak=None):
+    parts = [f'{label:<28} {seconds * 1000:10.1f} ms']
+    if rows:
+        parts.append(f'{rows / seconds:12,.0f} stops/s')
+    if size is not None:
+        parts.append(f'{size / 1024 / 1024:8.1f} MiB')
+    if peak is not None:
+        parts.append(f'peak {peak / 1024 / 1024:6.1f} MiB')
+    print('  '.join(parts))
+
+
+def bench_export_import(voya, args):
+    user_id = create_user(voya, 'exporter')
+    started = time.perf_counter()
+    seed_account(voya, user_id, args.stops)
+    report(f'seed {args.stops} stops', time.perf_counter() - started)
+    client = client_for(voya, user_id, 'exporter')
+    payloads = {}
+    for fmt in ('json', 'csv', 'ics'):
+        started = time.perf_counter()
+        payloads[fmt] = b''.join(client.get(f'/export.{fmt}').response)
+        elapsed = time.perf_counter() - started
+        peak = None
+        if args.memory:
+            # Separate pass: tracemalloc slows the export down by an order of magnitude
+            tracemalloc.start()
+            for chunk in client.get(f'/export.{fmt}').response:
+                pass
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        report(f'export {fmt}', elapsed, args.stops, len(payloads[fmt]), peak)
+    for fmt in ('json', 'csv'):
+        importer_id = create_user(voya, f'importer_{fmt}')
+        importer = client_for(voya, importer_id, f'importer_{fmt}')
+        started = time.perf_counter()
+        response = importer.post('/import', data={'file': (io.BytesIO(payloads[fmt]), f'trips.{fmt}')},
+                                 headers={'X-Requested-With': 'XMLHttpRequest'},
+                                 content_type='multipart/form-data')
+        elapsed = time.perf_counter() - started
+        if response.status_code != 200:
+            print(f'import {fmt} failed: {response.get_json()}')
+            continue
+        report(f'import {fmt}', elapsed, response.get_json()['stops'])
+
+
+def table_sizes(voya, tables):
+    """Return {table: bytes} including each table's indexes."""
+    from sqlalchemy import text
+    db = voya.db
+    with voya.app.app_context():
+        if db.engine.dialect.name == 'postgresql':
+            return {table: db.session.execute(text("SELECT pg_total_relation_size(:t)"), {'t': table}).scalar()
+                    for table in tables}
+        rows = db.session.execute(text(
+            "SELECT m.tbl_name, SUM(s.pgsize) FROM dbstat s JOIN sqlite_master m ON m.name = s.name "
+            "GROUP BY m.tbl_name")).all()
+        sizes = dict(rows)
+        return {table: sizes.get(table, 0) for table in tables}
+
+
+def compact(voya):
+    from sqlalchemy import text
+    with voya.app.app_context():
+        with voya.db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text('VACUUM' if voya.db.engine.dialect.name == 'sqlite' else 'VACUUM FULL'))
+
+
+def latency(label, fn, samples):
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f'{label:<28} mean {statistics.mean(timings):7.2f} ms  p95 {p95:7.2f} ms')
+
+
+def bench_route_storage(voya, args):
+    from models import Stop
+    user_id = create_user(voya, 'router')
+    trip_ids = seed_account(voya, user_id, args.stops, steps_per_stop=args.steps)
+    client = client_for(voya, user_id, 'router')
+    with voya.app.app_context():
+        sample_stops = [stop_id for (stop_id,) in voya.db.session.query(Stop.id).filter(Stop.trip_id == trip_ids[0])]
+    headers = {'X-Requested-With': 'XMLHttpRequest'}
+    rng = random.Random(1)
+
+    def view_day():
+        trip_id = rng.choice(trip_ids)
+        voya.fragment_cache.invalidate_trip(trip_id)  # measure the uncached render
+        client.get(f'/trip/{trip_id}?day=2020-01-{rng.randint(1, 28):02d}')
+
+    def edit_stop():
+        steps = [f'Edited step {s}' for s in range(args.steps)]
+        client.post(f'/edit_stop/{rng.choice(sample_stops)}', headers=headers, json={
+            'action': 'Edited', 'time': '10:00', 'destination': 'Somewhere',
+            'route': '; '.join(steps), 'route_steps': steps})
+
+    for mode in ('table', 'inline'):
+        if mode == 'inline':
+            voya.app.config['ROUTE_STEP_STORAGE'] = 'inline'
+            started = time.perf_counter()
+            result = voya.app.test_cli_runner().invoke(args=['convert-route-steps', '--to', 'inline'])
+            report('convert to inline', time.perf_counter() - started, args.stops)
+            print('  ' + result.output.strip())
+        compact(voya)
+        sizes = table_sizes(voya, ['stops', 'route_steps'])
+        print(f'[{mode}] stops {sizes["stops"] / 1024 / 1024:.1f} MiB, '
+              f'route_steps {sizes["route_steps"] / 1024 / 1024:.1f} MiB, '
+              f'total {sum(sizes.values()) / 1024 / 1024:.1f} MiB')
+        latency(f'[{mode}] itinerary day view', view_day, args.samples)
+        latency(f'[{mode}] edit_stop', edit_stop, args.samples)
+
+
+def bench_archive(voya, args):
+    from datetime import date, timedelta
+    from models import Stop, ArchivedStop
+    trips = max(1, args.stops // 500)
+    recent = max(1, trips // 10)
+    # All but the last `recent` trips departed more than ARCHIVE_AFTER_DAYS ago
+    first_day = date.today() - timedelta(days=voya.app.config['ARCHIVE_AFTER_DAYS'] + 40 * (trips - recent))
+    user_id = create_user(voya, 'archivist')
+    trip_ids = seed_account(voya, user_id, args.stops, steps_per_stop=args.steps, first_day=first_day)
+    client = client_for(voya, user_id, 'archivist')
+    headers = {'X-Requested-With': 'XMLHttpRequest'}
+    hot_trips = trip_ids[-recent:]
+    old_trips = trip_ids[:-recent]
+    rng = random.Random(1)
+
+    def view_day(pool):
+        def run():
+            trip_id = rng.choice(pool)
+            voya.fragment_cache.invalidate_trip(trip_id)
+            with voya.app.app_context():
+                start = voya.db.session.get(voya.Trip, trip_id).arrival_date
+            day = (date.fromisoformat(start) + timedelta(days=rng.randint(0, 29))).isoformat()
+            client.get(f'/trip/{trip_id}?day={day}')
+        return run
+
+    def stops_json(pool):
+        return lambda: client.get(f'/trip/{rng.choice(pool)}/stops', headers=headers)
+
+    def measure(label):
+        compact(voya)
+        sizes = table_sizes(voya, ['stops', 'route_steps', 'archived_stops', 'archived_route_steps'])
+        print(f'[{label}] hot {(sizes["stops"] + sizes["route_steps"]) / 1024 / 1024:.1f} MiB, '
+              f'archive {(sizes["archived_stops"] + sizes["archived_route_steps"]) / 1024 / 1024:.1f} MiB')
+        latency(f'[{label}] recent day view', view_day(hot_trips), args.samples)
+        latency(f'[{label}] recent trip stops', stops_json(hot_trips), args.samples)
+        latency(f'[{label}] old day view', view_day(old_trips), args.samples)
+        latency(f'[{label}] old trip stops', stops_json(old_trips), args.samples)
+
+    measure('before')
+    started = time.perf_counter()
+    result = voya.app.test_cli_runner().invoke(args=['archive-trips'])
+    report('archive-trips', time.perf_counter() - started)
+    print('  ' + result.output.strip())
+    with voya.app.app_context():
+        print(f'hot stops {Stop.query.count()}, archived stops {ArchivedStop.query.count()}')
+    measure('after')
+
+
+def bench_registration_flood(voya, args):
+    """Bots submitting the first registration step with fresh addresses and never coming back."""
+    from sqlalchemy import event
+    from models import User
+    voya.app.config['EMAIL_CHECK_DELIVERABILITY'] = False
+    mail_state = voya.app.extensions['mail']
+    mail_state.suppress = True
+    mail_state.default_sender = mail_state.default_sender or 'noreply@example.com'
+    with voya.app.app_context():
+        voya.db.create_all()  # login_attempts is declared after app.py's own create_all
+        engine = voya.db.engine
+    writes = Counter()
+
+    def count_writes(conn, cursor, statement, parameters, context, executemany):
+        match = re.match(r'\s*(INSERT INTO|UPDATE|DELETE FROM)\s+"?(\w+)', statement, re.IGNORECASE)
+        if match:
+            writes[match.group(2)] += len(parameters) if executemany else 1
+
+    event.listen(engine, 'before_cursor_execute', count_writes)
+    client = voya.app.test_client()
+    for mode in ('legacy', 'stateless'):
+        voya.app.config['REGISTRATION_MODE'] = mode
+        with voya.app.app_context():
+            users_before = User.query.count()
+        writes.clear()
+        timings = []
+        for i in range(args.samples):
+            started = time.perf_counter()
+            # A new source address per request, as a distributed flood would, so the per-IP limit never kicks in
+            response = client.post('/register', data={'verify_email': '1', 'email': f'bot{i}.{mode}@example.com'},
+                                   headers={'X-Forwarded-For': f'10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}'})
+            timings.append((time.perf_counter() - started) * 1000)
+            if response.status_code != 200:
+                print(f'request {i} failed with {response.status_code}')
+                break
+        compact(voya)
+        with voya.app.app_context():
+            users_after = User.query.count()
+        size = table_sizes(voya, ['users'])['users']
+        print(f'[{mode}] {len(timings)} requests  mean {statistics.mean(timings):6.2f} ms  '
+              f'users +{users_after - users_before} rows ({size / 1024:.0f} KiB)  '
+              f'row writes: users {writes["users"]}, '
+              f'other {sum(n for table, n in writes.items() if table != "users")} {dict(writes)}')
+
+
+def bench_search(voya, args):
+    user_id = create_user(voya, 'searcher')
+    seed_account(voya, user_id, args.stops, steps_per_stop=args.steps)
+    started = time.perf_counter()
+    result = voya.app.test_cli_runner().invoke(args=['rebuild-search-index'])
+    report('rebuild-search-index', time.perf_counter() - started, args.stops)
+    print('  ' + result.output.strip())
+    client = client_for(voya, user_id, 'searcher')
+    headers = {'X-Requested-With': 'XMLHttpRequest'}
+    rng = random.Random(1)
+    queries = {
+        # One matching stop, but "towards" and "stop" are in every route step
+        'specific stop': lambda: f'towards stop {rng.randint(1, args.stops)}',
+        # Matches every stop; only the newest SEARCH_CANDIDATE_LIMIT of them are ranked
+        'common term': lambda: 'landmark',
+        'prefix': lambda: 'visit pla',
+        'trip destination': lambda: f'city {rng.randint(0, args.stops // 500)}',
+    }
+    for label, query in queries.items():
+        latency(f'search {label}', lambda: client.get('/search', query_string={'q': query()}, headers=headers),
+                args.samples)
+
+
+def bench_overload(voya, args):
+    """Open-loop load against a gunicorn-like worker (a pool of --threads threads fed by an unbounded queue).
+
+    Every statement sleeps --db-latency ms to stand in for a slow database. Goodput counts the
+    successful responses that reached their client within --timeout seconds of arriving.
+    """
+    import bcrypt
+    from concurrent.futures import ThreadPoolExecutor
+    from sqlalchemy import event
+    app = voya.app
+    with app.app_context():
+        voya.db.create_all()  # login_attempts is declared after app.py's own create_all
+        engine = voya.db.engine
+    user_id = create_user(voya, 'overload')
+    password = 'Overload1'
+    with app.app_context():
+        user = voya.db.session.get(voya.User, user_id)
+        user.password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+        voya.db.session.commit()
+    trip_ids = seed_account(voya, user_id, 2000, stops_per_trip=100, steps_per_stop=3)
+    # Logged-in browsers; each request gets its own client carrying one of their session cookies
+    cookie_name = app.config['SESSION_COOKIE_NAME']
+    sessions = [client_for(voya, user_id, 'overload').get_cookie(cookie_name).value for _ in range(50)]
+    rng = random.Random(1)
+    xhr = {'X-Requested-With': 'XMLHttpRequest'}
+
+    def make_request():
+        roll = rng.random()
+        if roll < 0.7:
+            return 'read', 'GET', f'/trip/{rng.choice(trip_ids)}/stops', xhr, None, rng.choice(sessions)
+        if roll < 0.9:
+            return 'page', 'GET', f'/trip/{rng.choice(trip_ids)}', {}, None, rng.choice(sessions)
+        return 'login', 'POST', '/login', {}, {'identifier': 'overload', 'password': password}, None
+
+    def run(request, arrived):
+        kind, method, path, headers, data, sid = request
+        client = app.test_client()
+        if sid:
+            client.set_cookie(cookie_name, sid)
+        headers = dict(headers, **{'X-Request-Start': str(int(arrived * 1000)),
+                                   'X-Forwarded-For': f'10.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}'})
+        response = client.open(path, method=method, headers=headers, data=data, buffered=True)
+        return kind, response.status_code, time.time() - arrived, time.time()
+
+    def slow_database(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(args.db_latency / 1000)
+
+    def drive(rate, seconds):
+        """Offer `rate` requests/s (Poisson arrivals) for `seconds`; return the results and /ping samples."""
+        pool = ThreadPoolExecutor(max_workers=args.threads)
+        futures, pings = [], Counter()
+        started = time.time()
+        next_arrival = started
+        while next_arrival < started + seconds:
+            time.sleep(max(0.0, next_arrival - time.time()))
+            futures.append(pool.submit(run, make_request(), next_arrival))
+            if len(futures) % 20 == 0:
+                ping = app.test_client().get('/ping')
+                pings.update(ping.get_json()['degraded'] if ping.status_code == 503 else ['ok'])
+            next_arrival += rng.expovariate(rate)
+        pool.shutdown(wait=True)
+        return [future.result() for future in futures], pings
+
+    app.config['WORKER_THREADS'] = args.threads
+    app.config['ADMISSION_MAX_IN_FLIGHT'] = max(1, args.threads - 2)
+    event.listen(engine, 'before_cursor_execute', slow_database)
+    # Capacity: how many requests/s the worker completes when it is offered far more than it can take
+    app.config['ADMISSION_CONTROL'] = False
+    started = time.time()
+    calibration, _ = drive(200, 3)
+    capacity = len(calibration) / (max(r[3] for r in calibration) - started)
+    print(f'{args.threads} threads, {args.db_latency} ms per statement: capacity ~{capacity:.0f} requests/s')
+    for mode in ('off', 'on'):
+        app.config['ADMISSION_CONTROL'] = mode == 'on'
+        for load in [float(load) for load in args.load.split(',')]:
+            voya.admission.refused.clear()
+            results, pings = drive(capacity * load, args.seconds)
+            good = [r for r in results if r[1] < 400 and r[2] <= args.timeout]
+            late = [r for r in results if r[1] < 400 and r[2] > args.timeout]
+            refused = [r for r in results if r[1] in (429, 503)]
+            good_latency = sorted(r[2] for r in good) or [0]
+            by_kind = Counter(r[0] for r in good)
+            print(f'[admission {mode}] load {load:3.1f}x  offered {len(results) / args.seconds:6.1f}/s  '
+                  f'goodput {len(good) / args.seconds:6.1f}/s  late {len(late):4d}  refused {len(refused):4d}  '
+                  f'p50 {good_latency[len(good_latency) // 2] * 1000:6.0f} ms  '
+                  f'p99 {good_latency[int(len(good_latency) * 0.99)] * 1000:6.0f} ms  '
+                  f'good read/page/login {by_kind["read"]}/{by_kind["page"]}/{by_kind["login"]}  '
+                  f'/ping {dict(pings)}')
+    event.remove(engine, 'before_cursor_execute', slow_database)
+
+
+BENCHMARKS = {
+    'export-import': bench_export_import,
+    'route-storage': bench_route_storage,
+    'archive': bench_archive,
+    'search': bench_search,
+    'registration-flood': bench_registration_flood,
+    'overload': bench_overload,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Voya benchmarks')
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS))
+    parser.add_argument('--database-url', help='Run against this database instead of a temporary SQLite file')
+    parser.add_argument('--stops', type=int, default=100000, help='Number of stops to seed')
+    parser.add_argument('--steps', type=int, default=5, help='Route steps per seeded stop')
+    parser.add_argument('--samples', type=int, default=300, help='Requests per latency measurement')
+    parser.add_argument('--memory', action='store_true', help='Also measure peak Python memory (slow)')
+    parser.add_argument('--load', default='0.5,1,2,4', help='overload: offered load as multiples of capacity')
+    parser.add_argument('--seconds', type=float, default=20, help='overload: seconds of traffic per load level')
+    parser.add_argument('--threads', type=int, default=8, help='overload: worker threads (Procfile: 8)')
+    parser.add_argument('--db-latency', type=float, default=20, help='overload: added ms per SQL statement')
+    parser.add_argument('--timeout', type=float, default=5, help='overload: seconds before a client gives up')
+    args = parser.parse_args()
+    voya = setup_app(args.database_url)
+    BENCHMARKS[args.benchmark](voya, args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
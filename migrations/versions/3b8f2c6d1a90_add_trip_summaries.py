@@ -0,0 +1,43 @@
+"""Add trip summaries and the stops (trip_id, date) index
+
+Revision ID: 3b8f2c6d1a90
+Revises: ee0f0151a7ee
+Create Date: 2026-10-19 09:12:41.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b8f2c6d1a90'
+down_revision = 'ee0f0151a7ee'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # app.py runs db.create_all() on import, so the table may already exist
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('trip_summaries'):
+        op.create_table('trip_summaries',
+        sa.Column('trip_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('stop_count', sa.Integer(), nullable=False),
+        sa.Column('days', sa.JSON(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['trip_id'], ['trips.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('trip_id')
+        )
+        op.create_index('ix_trip_summaries_user_id', 'trip_summaries', ['user_id'], unique=False)
+    stop_indexes = {index['name'] for index in inspector.get_indexes('stops')}
+    if 'ix_stops_trip_id_date' not in stop_indexes:
+        op.create_index('ix_stops_trip_id_date', 'stops', ['trip_id', 'date'], unique=False)
+    # Populate the summaries for existing trips afterwards with `flask rebuild-trip-summaries`
+
+
+def downgrade():
+    op.drop_index('ix_stops_trip_id_date', table_name='stops')
+    op.drop_index('ix_trip_summaries_user_id', table_name='trip_summaries')
+    op.drop_table('trip_summaries')
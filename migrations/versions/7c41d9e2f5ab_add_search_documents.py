@@ -0,0 +1,71 @@
+"""Add search documents with a full-text index
+
+Revision ID: 7c41d9e2f5ab
+Revises: 3b8f2c6d1a90
+Create Date: 2026-10-19 11:47:03.502871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c41d9e2f5ab'
+down_revision = '3b8f2c6d1a90'
+branch_labels = None
+depends_on = None
+
+
+POSTGRES_DDL = [
+    "ALTER TABLE search_documents ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('english', coalesce(title, '') || ' ' || coalesce(content, ''))) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_search_documents_search_vector ON search_documents USING GIN (search_vector)",
+]
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_documents_fts USING fts5("
+    "title, content, content='search_documents', content_rowid='id', tokenize='unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS search_documents_ai AFTER INSERT ON search_documents BEGIN "
+    "INSERT INTO search_documents_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS search_documents_ad AFTER DELETE ON search_documents BEGIN "
+    "INSERT INTO search_documents_fts(search_documents_fts, rowid, title, content) "
+    "VALUES ('delete', old.id, old.title, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS search_documents_au AFTER UPDATE ON search_documents BEGIN "
+    "INSERT INTO search_documents_fts(search_documents_fts, rowid, title, content) "
+    "VALUES ('delete', old.id, old.title, old.content); "
+    "INSERT INTO search_documents_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+]
+
+
+def upgrade():
+    # app.py runs db.create_all() on import, so the table may already exist
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table('search_documents'):
+        op.create_table('search_documents',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('trip_id', sa.Integer(), nullable=False),
+        sa.Column('stop_id', sa.Integer(), nullable=True),
+        sa.Column('kind', sa.String(length=10), nullable=False),
+        sa.Column('day', sa.String(length=10), nullable=True),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.ForeignKeyConstraint(['stop_id'], ['stops.id'], ),
+        sa.ForeignKeyConstraint(['trip_id'], ['trips.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('stop_id')
+        )
+        op.create_index('ix_search_documents_trip_id', 'search_documents', ['trip_id'], unique=False)
+        op.create_index('ix_search_documents_user_id', 'search_documents', ['user_id'], unique=False)
+    for statement in {'postgresql': POSTGRES_DDL, 'sqlite': SQLITE_DDL}.get(bind.dialect.name, []):
+        op.execute(statement)
+    # Index existing trips and stops afterwards with `flask rebuild-search-index`
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS search_documents_fts")
+    op.drop_index('ix_search_documents_user_id', table_name='search_documents')
+    op.drop_index('ix_search_documents_trip_id', table_name='search_documents')
+    op.drop_table('search_documents')
@@ -0,0 +1,29 @@
+"""Add a version counter to trip summaries
+
+Revision ID: a52e7f1c0d34
+Revises: 7c41d9e2f5ab
+Create Date: 2026-10-19 14:05:27.640913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a52e7f1c0d34'
+down_revision = '7c41d9e2f5ab'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # db.create_all() may already have created trip_summaries with the column
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('trip_summaries')}
+    if 'version' not in columns:
+        with op.batch_alter_table('trip_summaries', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('trip_summaries', schema=None) as batch_op:
+        batch_op.drop_column('version')
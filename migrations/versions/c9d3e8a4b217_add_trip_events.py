@@ -0,0 +1,36 @@
+"""Add the trip change event feed
+
+Revision ID: c9d3e8a4b217
+Revises: a52e7f1c0d34
+Create Date: 2026-10-19 16:22:48.031577
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9d3e8a4b217'
+down_revision = 'a52e7f1c0d34'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # app.py runs db.create_all() on import, so the table may already exist
+    if not sa.inspect(op.get_bind()).has_table('trip_events'):
+        op.create_table('trip_events',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('trip_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_trip_events_trip_id_id', 'trip_events', ['trip_id', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_trip_events_trip_id_id', table_name='trip_events')
+    op.drop_table('trip_events')
@@ -0,0 +1,35 @@
+"""Add the inline route steps column to stops and index route_steps by stop
+
+Revision ID: d1f6a0b9c852
+Revises: c9d3e8a4b217
+Create Date: 2026-10-19 18:40:12.774306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd1f6a0b9c852'
+down_revision = 'c9d3e8a4b217'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Only adds the column; existing steps are moved in committed batches with
+    # `flask convert-route-steps --to inline` once ROUTE_STEP_STORAGE=inline is deployed
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('stops')}
+    if 'inline_route_steps' not in columns:
+        with op.batch_alter_table('stops', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('inline_route_steps', sa.JSON(none_as_null=True), nullable=True))
+    step_indexes = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('route_steps')}
+    if 'ix_route_steps_stop_id_step_order' not in step_indexes:
+        op.create_index('ix_route_steps_stop_id_step_order', 'route_steps', ['stop_id', 'step_order'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_route_steps_stop_id_step_order', table_name='route_steps')
+    # Run `flask convert-route-steps --to table` first, or the inline steps are lost
+    with op.batch_alter_table('stops', schema=None) as batch_op:
+        batch_op.drop_column('inline_route_steps')
@@ -0,0 +1,69 @@
+"""Add ON DELETE CASCADE to the user/trip/stop foreign keys
+
+Revision ID: e4a7b2c95d10
+Revises: d1f6a0b9c852
+Create Date: 2026-10-19 19:25:41.318027
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a7b2c95d10'
+down_revision = 'd1f6a0b9c852'
+branch_labels = None
+depends_on = None
+
+
+CASCADE_FOREIGN_KEYS = {
+    'trips': [('user_id', 'users')],
+    'stops': [('trip_id', 'trips'), ('user_id', 'users')],
+    'route_steps': [('stop_id', 'stops')],
+    'trip_summaries': [('trip_id', 'trips'), ('user_id', 'users')],
+    'search_documents': [('user_id', 'users'), ('trip_id', 'trips'), ('stop_id', 'stops')],
+}
+
+# SQLite foreign keys are unnamed; batch mode needs a name to drop them by
+NAMING_CONVENTION = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+
+def set_ondelete(ondelete):
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        # Rebuilding a table drops the old copy, which with enforcement on would cascade into its children.
+        # The rebuild also drops the FTS5 sync triggers on search_documents; ensure_search_index()
+        # recreates them when the app next starts, and the copied rows keep their rowids
+        op.execute('PRAGMA foreign_keys=OFF')
+    inspector = sa.inspect(bind)
+    for table, keys in CASCADE_FOREIGN_KEYS.items():
+        existing = {tuple(fk['constrained_columns']): fk for fk in inspector.get_foreign_keys(table)}
+        changes = []
+        for column, referred in keys:
+            fk = existing.get((column,))
+            if fk is None or fk['options'].get('ondelete') == ondelete:
+                continue
+            changes.append((fk['name'] or f'fk_{table}_{column}_{referred}', column, referred))
+        if not changes:
+            continue
+        with op.batch_alter_table(table, schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+            for name, column, referred in changes:
+                batch_op.drop_constraint(name, type_='foreignkey')
+                batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete=ondelete)
+    if bind.dialect.name == 'sqlite':
+        op.execute('PRAGMA foreign_keys=ON')
+
+
+def upgrade():
+    set_ondelete('CASCADE')
+    # Cascades from users look children up by user_id; PostgreSQL does not index foreign keys itself
+    for table in ('trips', 'stops'):
+        indexes = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+        if f'ix_{table}_user_id' not in indexes:
+            op.create_index(f'ix_{table}_user_id', table, ['user_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_stops_user_id', table_name='stops')
+    op.drop_index('ix_trips_user_id', table_name='trips')
+    set_ondelete(None)
@@ -0,0 +1,79 @@
+"""Add the archive tables for stops and route steps of old trips
+
+Revision ID: f2b6c8d41e73
+Revises: e4a7b2c95d10
+Create Date: 2026-10-19 20:48:05.602193
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b6c8d41e73'
+down_revision = 'e4a7b2c95d10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        # Archived stops keep their ids; without AUTOINCREMENT SQLite reuses the highest free rowid
+        stops_sql = bind.execute(sa.text("SELECT sql FROM sqlite_master WHERE name = 'stops'")).scalar()
+        if 'AUTOINCREMENT' not in stops_sql.upper():
+            op.execute('PRAGMA foreign_keys=OFF')
+            with op.batch_alter_table('stops', schema=None, recreate='always',
+                                      table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+                pass
+            op.execute('PRAGMA foreign_keys=ON')
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('trips')}
+    if 'archived_at' not in columns:
+        with op.batch_alter_table('trips', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('archived_at', sa.DateTime(), nullable=True))
+    # app.py runs db.create_all() on import, so the tables may already exist
+    if not sa.inspect(op.get_bind()).has_table('archived_stops'):
+        op.create_table('archived_stops',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('trip_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('action', sa.String(length=120), nullable=False),
+        sa.Column('time', sa.String(length=10), nullable=False),
+        sa.Column('date', sa.String(length=10), nullable=False),
+        sa.Column('destination', sa.String(length=120), nullable=False),
+        sa.Column('route', sa.Text(), nullable=False),
+        sa.Column('inline_route_steps', sa.JSON(none_as_null=True), nullable=True),
+        sa.ForeignKeyConstraint(['trip_id'], ['trips.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_archived_stops_trip_id_date', 'archived_stops', ['trip_id', 'date'], unique=False)
+        op.create_index('ix_archived_stops_user_id', 'archived_stops', ['user_id'], unique=False)
+    if not sa.inspect(op.get_bind()).has_table('archived_route_steps'):
+        op.create_table('archived_route_steps',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('stop_id', sa.Integer(), nullable=False),
+        sa.Column('step_order', sa.Integer(), nullable=False),
+        sa.Column('step_text', sa.Text(), nullable=False),
+        sa.ForeignKeyConstraint(['stop_id'], ['archived_stops.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_archived_route_steps_stop_id_step_order', 'archived_route_steps',
+                        ['stop_id', 'step_order'], unique=False)
+
+
+def downgrade():
+    # Bring archived trips back first (`flask restore-trips`), or their stops are lost
+    op.drop_index('ix_archived_route_steps_stop_id_step_order', table_name='archived_route_steps')
+    op.drop_table('archived_route_steps')
+    op.drop_index('ix_archived_stops_user_id', table_name='archived_stops')
+    op.drop_index('ix_archived_stops_trip_id_date', table_name='archived_stops')
+    op.drop_table('archived_stops')
+    sqlite = op.get_bind().dialect.name == 'sqlite'
+    if sqlite:
+        # Dropping the column rebuilds trips, whose old copy would otherwise cascade into stops
+        op.execute('PRAGMA foreign_keys=OFF')
+    with op.batch_alter_table('trips', schema=None) as batch_op:
+        batch_op.drop_column('archived_at')
+    if sqlite:
+        op.execute('PRAGMA foreign_keys=ON')
@@ -16,37 +16,124 @@ class User(db.Model):
     token_expiry = db.Column(db.DateTime)
     
     # Relationship with other tables
-    trips = db.relationship('Trip', backref='user', lazy=True, cascade='all, delete-orphan')
-    stops = db.relationship('Stop', backref='user', lazy=True, cascade='all, delete-orphan')
+    # Children are removed by ON DELETE CASCADE in the database, not loaded and deleted one by one
+    trips = db.relationship('Trip', backref='user', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    stops = db.relationship('Stop', backref='user', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
 
 class Trip(db.Model):
     __tablename__ = 'trips'
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     destination = db.Column(db.String(120), nullable=False)
     arrival_date = db.Column(db.String(10), nullable=False)
     departure_date = db.Column(db.String(10), nullable=False)
+    # Set while the trip's stops and route steps live in the archive tables (see `flask archive-trips`)
+    archived_at = db.Column(db.DateTime)
     
     # Relationship with stops
-    stops = db.relationship('Stop', backref='trip', lazy=True, cascade='all, delete-orphan')
+    stops = db.relationship('Stop', backref='trip', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    summary = db.relationship('TripSummary', backref='trip', lazy=True, uselist=False, cascade='all, delete-orphan',
+                              passive_deletes=True)
 
 class Stop(db.Model):
     __tablename__ = 'stops'
     id = db.Column(db.Integer, primary_key=True)
-    trip_id = db.Column(db.Integer, db.ForeignKey('trips.id'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    trip_id = db.Column(db.Integer, db.ForeignKey('trips.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     action = db.Column(db.String(120), nullable=False)
     time = db.Column(db.String(10), nullable=False)
     date = db.Column(db.String(10), nullable=False)
     destination = db.Column(db.String(120), nullable=False)
     route = db.Column(db.Text, nullable=False)
+    # Ordered step texts when ROUTE_STEP_STORAGE is 'inline'; NULL means the steps live in route_steps
+    inline_route_steps = db.Column(db.JSON(none_as_null=True))
+
+    __table_args__ = (
+        db.Index('ix_stops_trip_id_date', 'trip_id', 'date'),
+        # Stop ids survive archiving, so SQLite must never hand out the id of an archived stop again
+        {'sqlite_autoincrement': True},
+    )
 
     # Relationship with route steps
-    route_steps = db.relationship('RouteStep', backref='stop', lazy=True, cascade='all, delete-orphan')
+    route_steps = db.relationship('RouteStep', backref='stop', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
 
 class RouteStep(db.Model):
     __tablename__ = 'route_steps'
     id = db.Column(db.Integer, primary_key=True)
-    stop_id = db.Column(db.Integer, db.ForeignKey('stops.id'), nullable=False)
+    stop_id = db.Column(db.Integer, db.ForeignKey('stops.id', ondelete='CASCADE'), nullable=False)
+    step_order = db.Column(db.Integer, nullable=False)
+    step_text = db.Column(db.Text, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_route_steps_stop_id_step_order', 'stop_id', 'step_order'),
+    )
+
+class ArchivedStop(db.Model):
+    """A stop of an archived trip, moved out of the hot stops table with its id unchanged."""
+    __tablename__ = 'archived_stops'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    trip_id = db.Column(db.Integer, db.ForeignKey('trips.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    action = db.Column(db.String(120), nullable=False)
+    time = db.Column(db.String(10), nullable=False)
+    date = db.Column(db.String(10), nullable=False)
+    destination = db.Column(db.String(120), nullable=False)
+    route = db.Column(db.Text, nullable=False)
+    inline_route_steps = db.Column(db.JSON(none_as_null=True))
+
+    __table_args__ = (
+        db.Index('ix_archived_stops_trip_id_date', 'trip_id', 'date'),
+    )
+
+    route_steps = db.relationship('ArchivedRouteStep', backref='stop', lazy=True, cascade='all, delete-orphan',
+                                  passive_deletes=True)
+
+class ArchivedRouteStep(db.Model):
+    __tablename__ = 'archived_route_steps'
+    id = db.Column(db.Integer, primary_key=True)
+    stop_id = db.Column(db.Integer, db.ForeignKey('archived_stops.id', ondelete='CASCADE'), nullable=False)
     step_order = db.Column(db.Integer, nullable=False)
-    step_text = db.Column(db.Text, nullable=False)
\ No newline at end of file
+    step_text = db.Column(db.Text, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_archived_route_steps_stop_id_step_order', 'stop_id', 'step_order'),
+    )
+
+class TripSummary(db.Model):
+    __tablename__ = 'trip_summaries'
+    trip_id = db.Column(db.Integer, db.ForeignKey('trips.id', ondelete='CASCADE'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    stop_count = db.Column(db.Integer, nullable=False, default=0)
+    # {"YYYY-MM-DD": {"count": n, "first": {"id", "time", "action", "destination"}}}
+    days = db.Column(db.JSON, nullable=False, default=dict)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Bumped on every change to the trip or its stops; keys the rendered fragment cache
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+class SearchDocument(db.Model):
+    __tablename__ = 'search_documents'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    trip_id = db.Column(db.Integer, db.ForeignKey('trips.id', ondelete='CASCADE'), nullable=False, index=True)
+    # NULL for trip documents, and for stops of archived trips (archived_stops is not referenced)
+    stop_id = db.Column(db.Integer, db.ForeignKey('stops.id', ondelete='CASCADE'), unique=True)
+    kind = db.Column(db.String(10), nullable=False)  # 'trip' or 'stop'
+    day = db.Column(db.String(10))
+    title = db.Column(db.String(255), nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    # The full-text index itself is backend specific and created by ensure_search_index() in app.py
+
+class TripEvent(db.Model):
+    __tablename__ = 'trip_events'
+    # The id doubles as the SSE event id clients resume from with Last-Event-ID
+    id = db.Column(db.Integer, primary_key=True)
+    # No foreign key: 'trip_deleted' events must outlive the trip; old events are pruned by cleanup-database
+    trip_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    kind = db.Column(db.String(20), nullable=False)
+    payload = db.Column(db.JSON, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_trip_events_trip_id_id', 'trip_id', 'id'),
+    )
@@ -34,6 +34,24 @@ function updateCardsToShow() {
     updateArrowState();
 }
 
+// trip[5] is the stop count and trip[6] the next upcoming stop, both from the trip summary
+function tripStopCount(trip) {
+    const count = trip[5] || 0;
+    return count === 1 ? '1 stop' : `${count} stops`;
+}
+
+function escapeHtml(str) {
+    const div = document.createElement('div');
+    div.textContent = str || '';
+    return div.innerHTML;
+}
+
+function nextStopHtml(trip) {
+    const next = trip[6];
+    if (!next) return '';
+    return `<p class="next-stop"><strong>Next:</strong> ${escapeHtml(next.date)} ${escapeHtml(next.time)} &middot; ${escapeHtml(next.action)}</p>`;
+}
+
 function renderTrips() {
     const container = document.getElementById('trip-cards-container');
     container.innerHTML = '';
@@ -68,6 +86,10 @@ function renderTrips() {
                                 <p>${trip[4]}</p>
                             </div>
                         </div>
+                        <div class="trip-summary">
+                            <p>${tripStopCount(trip)}</p>
+                            ${nextStopHtml(trip)}
+                        </div>
                     </div>
                 `;
                 container.appendChild(card);
@@ -144,6 +166,35 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     };
 
+    const importInput = document.getElementById('import-file');
+    if (importInput) {
+        importInput.onchange = function() {
+            if (!importInput.files.length) return;
+            const formData = new FormData();
+            formData.append('file', importInput.files[0]);
+            fetch('/import', {
+                    method: 'POST',
+                    headers: {
+                        'X-Requested-With': 'XMLHttpRequest'
+                    },
+                    body: formData
+                })
+                .then(r => r.json())
+                .then(response => {
+                    importInput.value = '';
+                    if (response.error) {
+                        alert(response.error);
+                    } else {
+                        window.location.reload();
+                    }
+                })
+                .catch(() => {
+                    importInput.value = '';
+                    alert('Failed to import trips. Please try again.');
+                });
+        };
+    }
+
     window.addEventListener('resize', function() {
         updateCardsToShow();
     });
@@ -30,18 +30,129 @@ document.addEventListener('DOMContentLoaded', function() {
         return str.length > maxLen ? str.slice(0, maxLen - 1) + '…' : str;
     }
 
-    function renderStopsForDay(day) {
-        fetch(`/trip/${tripId}/stops`, {
+    // Stops of the whole trip, loaded the first time they are needed (the server renders the
+    // selected day into the page) and then kept in sync from mutation responses and the
+    // server's event stream instead of refetching
+    let stopsCache = null;
+    let stopsLoading = null;
+
+    function loadStops() {
+        if (stopsLoading) return stopsLoading;
+        stopsLoading = fetch(`/trip/${tripId}/stops`, {
                 headers: {
                     'X-Requested-With': 'XMLHttpRequest'
                 }
             })
             .then(r => r.json())
+            .then(stops => {
+                stopsCache = stops;
+                refreshDayCounts();
+                return stops;
+            })
+            .finally(() => {
+                stopsLoading = null;
+            });
+        return stopsLoading;
+    }
+
+    function refreshDayCounts() {
+        const counts = {};
+        stopsCache.forEach(stop => {
+            counts[stop.date] = (counts[stop.date] || 0) + 1;
+        });
+        days.forEach(day => updateDayCount(day, counts[day] || 0));
+    }
+
+    // Apply one change event (from our own request or another tab/device) to the local state
+    function applyTripEvent(kind, data) {
+        if (kind === 'trip_deleted') {
+            window.location.href = '/';
+            return;
+        }
+        if (kind === 'trip_updated') {
+            if (data.arrival_date !== arrival || data.departure_date !== departure) {
+                window.location.reload(); // The day list changed
+                return;
+            }
+            const destinationLabel = document.getElementById('trip-destination');
+            if (destinationLabel) destinationLabel.textContent = data.destination;
+            return;
+        }
+        if (kind === 'stops_reset') {
+            stopsCache = null;
+            stopsLoading = null;
+            if (!currentlyEditingStopId) renderStopsForDay(selectedDay);
+            return;
+        }
+        if (stopsCache === null) {
+            // Nothing loaded yet: a full load already includes the change
+            if (currentlyEditingStopId) loadStops();
+            else renderStopsForDay(selectedDay);
+            return;
+        }
+        const previous = stopsCache.find(stop => stop.id == data.id);
+        stopsCache = stopsCache.filter(stop => stop.id != data.id);
+        if (kind === 'stop_added' || kind === 'stop_updated') {
+            stopsCache.push(data);
+        }
+        refreshDayCounts();
+        const touchesDay = data.date === selectedDay || (previous && previous.date === selectedDay);
+        // Don't re-render under an open inline edit form; it re-renders when the edit ends
+        if (touchesDay && !currentlyEditingStopId) renderStopsForDay(selectedDay);
+    }
+
+    // The page was rendered as of this event; the stream starts from here so that nothing
+    // committed between the render and the first connection is missed
+    let lastEventId = scriptTag.dataset.lastEventId || '0';
+    let eventsRetryDelay = 1000;
+
+    function openTripEvents(resumed) {
+        // EventSource reconnects by itself after the server ends a stream and resumes with the
+        // Last-Event-ID header, but gives up for good on an error response (a 503 when the
+        // worker's streams are full, a redirect to /login); reopen those with a backoff
+        const tripEvents = new EventSource(`/trip/${tripId}/events?last_event_id=${encodeURIComponent(lastEventId)}`);
+        ['stop_added', 'stop_updated', 'stop_deleted', 'stops_reset', 'trip_updated', 'trip_deleted'].forEach(kind => {
+            tripEvents.addEventListener(kind, e => {
+                if (e.lastEventId) lastEventId = e.lastEventId;
+                applyTripEvent(kind, JSON.parse(e.data));
+            });
+        });
+        tripEvents.onopen = function() {
+            eventsRetryDelay = 1000;
+            if (resumed) {
+                // Events may have been cleaned up while we were away; reload instead of trusting them
+                resumed = false;
+                applyTripEvent('stops_reset', {});
+            }
+        };
+        tripEvents.onerror = function() {
+            if (tripEvents.readyState !== EventSource.CLOSED) return;
+            setTimeout(() => openTripEvents(true), eventsRetryDelay);
+            eventsRetryDelay = Math.min(eventsRetryDelay * 2, 60000);
+        };
+    }
+
+    if (window.EventSource) {
+        openTripEvents(false);
+    }
+
+    // Keep the per-day stop count badge in sync after adds/deletes
+    function updateDayCount(day, count) {
+        const btn = document.querySelector(`.day-btn[data-day="${day}"]`);
+        if (!btn) return;
+        const badge = btn.querySelector('.day-stop-count');
+        if (badge) badge.textContent = count > 0 ? count : '';
+    }
+
+    function renderStopsForDay(day) {
+        const stopsReady = stopsCache !== null ? Promise.resolve(stopsCache) : loadStops();
+        stopsReady
             .then(stops => {
                 // Only show stops for the selected day
                 const stopsForDay = stops.filter(stop => stop.date === day);
                 // Sort by time (earliest first)
                 stopsForDay.sort((a, b) => (a.time || '').localeCompare(b.time || ''));
+                updateDayCount(day, stopsForDay.length);
                 const stopsList = document.getElementById('stops-list');
                 stopsList.innerHTML = '';
                 if (stopsForDay.length === 0) {
@@ -232,10 +343,17 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
 
-    // Initial render
+    // Initial render; the selected day's stops are already in the page
     renderDayButtons();
     updateDayLabel(selectedDay);
-    renderStopsForDay(selectedDay);
+
+    // A page restored from the back/forward cache shows stops from when it was left
+    window.addEventListener('pageshow', function(e) {
+        if (e.persisted && !currentlyEditingStopId) {
+            stopsCache = null;
+            renderStopsForDay(selectedDay);
+        }
+    });
 
     // In-place edit for trip details
     const editBtn = document.getElementById('edit-trip-btn');
@@ -254,6 +372,12 @@ document.addEventListener('DOMContentLoaded', function() {
                            style="margin-right:0.5rem;">
                     <input type="date" id="edit-departure" value="${departure}" min="${arrival}" required
                            style="margin-right:0.5rem;">
+                    <select id="edit-stop-dates" style="margin-right:0.5rem;">
+                        <option value="keep">Keep stop dates</option>
+                        <option value="shift">Shift stops with the trip</option>
+                        <option value="clamp">Move outside stops to the nearest day</option>
+                        <option value="trim">Remove stops outside the dates</option>
+                    </select>
                     <button type="submit" class="edit-trip-btn">Save</button>
                     <button type="button" id="cancel-edit-trip" class="edit-trip-btn"
                             style="background:#eee;color:#013A63;">Cancel</button>
@@ -280,8 +404,9 @@ document.addEventListener('DOMContentLoaded', function() {
             // Handle cancel button
             document.getElementById('cancel-edit-trip').onclick = function() {
                 tripHeader.innerHTML = originalContent;
-                // Reattach edit button handler
+                // Reattach edit and duplicate button handlers
                 document.getElementById('edit-trip-btn').onclick = editBtn.onclick;
+                document.getElementById('clone-trip-btn').onclick = cloneTrip;
             };
 
             // Handle form submission
@@ -290,6 +415,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 const newDest = document.getElementById('edit-destination').value;
                 const newArr = document.getElementById('edit-arrival').value;
                 const newDep = document.getElementById('edit-departure').value;
+                const stopDates = document.getElementById('edit-stop-dates').value;
 
                 // Client-side validation
                 const arrivalDate = new Date(newArr);
@@ -299,6 +425,9 @@ document.addEventListener('DOMContentLoaded', function() {
                     alert('Departure date must be the same day or after arrival date.');
                     return;
                 }
+                if (stopDates === 'trim' && !confirm('Delete all stops outside the new dates?')) {
+                    return;
+                }
 
                 // Send update request with CSRF protection header
                 fetch(`/edit_trip/${tripId}`, {
@@ -310,7 +439,8 @@ document.addEventListener('DOMContentLoaded', function() {
                         body: JSON.stringify({
                             destination: newDest,
                             arrival: newArr,
-                            departure: newDep
+                            departure: newDep,
+                            stop_dates: stopDates
                         })
                     }).then(r => r.json())
                     .then(response => {
@@ -327,6 +457,36 @@ document.addEventListener('DOMContentLoaded', function() {
         };
     }
 
+    // Copy the trip with all its stops to new dates, server side
+    function cloneTrip() {
+        const newArrival = prompt('Arrival date for the copy (YYYY-MM-DD):', arrival);
+        if (!newArrival) return;
+        fetch(`/trip/${tripId}/clone`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-Requested-With': 'XMLHttpRequest'
+                },
+                body: JSON.stringify({
+                    arrival: newArrival
+                })
+            }).then(r => r.json())
+            .then(response => {
+                if (response.error) {
+                    alert(response.error);
+                } else {
+                    window.location.href = response.url;
+                }
+            })
+            .catch(error => {
+                alert('Failed to duplicate trip. Please try again.');
+            });
+    }
+    const cloneBtn = document.getElementById('clone-trip-btn');
+    if (cloneBtn) {
+        cloneBtn.onclick = cloneTrip;
+    }
+
     const addStopBtn = document.getElementById('add-stop-btn');
     const addStopModal = document.getElementById('add-stop-modal');
     const addStopForm = document.getElementById('add-stop-form');
@@ -438,7 +598,7 @@ document.addEventListener('DOMContentLoaded', function() {
                             <button type="button" class="remove-step-btn" style="display:none;">&times;</button>
                         </li>
                     `;
-                    renderStopsForDay(selectedDay);
+                    applyTripEvent('stop_added', response.stop);
                 }
             })
             .catch(error => {
@@ -555,6 +715,7 @@ document.addEventListener('DOMContentLoaded', function() {
                         alert(resp.error);
                     } else {
                         currentlyEditingStopId = null;
+                        applyTripEvent('stop_updated', resp.stop);
                         renderStopsForDay(selectedDay);
                     }
                 });
@@ -590,18 +751,14 @@ document.addEventListener('DOMContentLoaded', function() {
                     })
                     .then(r => r.json())
                     .then(resp => {
-                        if (resp.success) renderStopsForDay(selectedDay);
+                        if (resp.success) applyTripEvent('stop_deleted', { id: parseInt(stopId), date: selectedDay });
                         else alert('Failed to delete stop.');
                     });
             }
         } else if (e.target.classList.contains('edit-stop-btn')) {
             // Get the full stop data and create an inline edit form
-            fetch(`/trip/${tripId}/stops`, {
-                    headers: {
-                        'X-Requested-With': 'XMLHttpRequest'
-                    }
-                })
-                .then(r => r.json())
+            const stopsReady = stopsCache !== null ? Promise.resolve(stopsCache) : loadStops();
+            stopsReady
                 .then(stops => {
                     const stop = stops.find(s => s.id == stopId);
                     if (!stop) return;